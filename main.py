@@ -1,177 +1,483 @@
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.common.exceptions import WebDriverException, TimeoutException, NoSuchElementException
+from selenium.common.exceptions import WebDriverException, TimeoutException, NoSuchElementException, NoSuchWindowException, InvalidSessionIdException
 from selenium.webdriver.common.by import By
-import time
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.client_config import ClientConfig
+from selenium.webdriver.firefox.remote_connection import FirefoxRemoteConnection
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+import os
 import json
+import queue
+import shutil
+import tempfile
+import threading
+import functools
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+import orjson
+
+_SUPPORTED_LOCATORS = {
+    "id": By.ID,
+    "xpath": By.XPATH,
+    "name": By.NAME,
+    "class_name": By.CLASS_NAME,
+    "css_selector": By.CSS_SELECTOR,
+    "tag_name": By.TAG_NAME,
+    "link_text": By.LINK_TEXT,
+    "partial_link_text": By.PARTIAL_LINK_TEXT
+}
+_SUPPORTED_LOCATOR_NAMES = ", ".join(_SUPPORTED_LOCATORS)
+_BY_XPATH = By.XPATH
+
+# Compact JSON by default, set MCP_JSON_INDENT=1 for human-readable responses
+_JSON_OPTION = orjson.OPT_INDENT_2 if int(os.getenv("MCP_JSON_INDENT", "0")) else 0
+
+# Browser sessions kept per FirefoxAutoBrowser: one active, the rest pre-warmed spares
+_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "1"))
+
+# MCP transport: streamable-http for remote clients, stdio for a client that starts this script itself
+_MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "streamable-http")
+
+# Constant script sources, values are passed as script arguments
+_NEW_TAB_JS = "window.open('');"
+_SCROLL_DOWN_JS = "window.scrollBy(0, arguments[0]);"
+_SCROLL_UP_JS = "window.scrollBy(0, -arguments[0]);"
+_SCROLL_INTO_VIEW_JS = "arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});"
+_SMOOTH_SCROLL_INTO_VIEW_JS = "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});"
+
+_CONTENT_RETURN_MODES = ("inline", "file", "auto")
+_INLINE_CONTENT_LIMIT = 64 * 1024
+
+@functools.lru_cache(maxsize=4)
+def _firefox_options(firefox_binary_path):
+    """
+    Build the Firefox options once per binary path. Remote only reads them through
+    to_capabilities(), which rewrites the same keys on every call, so every session
+    (including pool spares) can share one options object
+    :param firefox_binary_path: Firefox executable file path
+    Return: Configured FirefoxOptions
+    """
+    firefox_options = FirefoxOptions()
+    firefox_options.binary_location = firefox_binary_path
+
+    custom_user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0"
+    firefox_options.add_argument(f"--user-agent={custom_user_agent}")
+
+    firefox_options.set_preference("dom.webnotifications.enabled", False)
+    firefox_options.set_preference("dom.popup_maximum", -1)
+    firefox_options.set_preference("browser.popups.showPopupBlocker", False)
+    firefox_options.set_preference("dom.disable_open_during_load", False)
+    firefox_options.set_preference("browser.link.open_newwindow", 3)
+    firefox_options.set_preference("browser.link.open_newwindow.restriction", 0)
+
+    firefox_options.add_argument("--ignore-certificate-errors")
+    return firefox_options
+
+def _resolve_handle(target, handles):
+    """
+    Resolve a tab target to its window handle
+    :param target: Target tab (str: tab handle; int: tab index, starting from 0)
+    :param handles: Current tab handle list
+    Return: Window handle of the target tab
+    """
+    if isinstance(target, int):
+        if not 0 <= target < len(handles):
+            raise ValueError(
+                f"Tab index {target} is invalid, only {len(handles)} tabs exist currently (index 0~{len(handles) - 1})")
+        return handles[target]
+    if isinstance(target, str):
+        if target not in handles:
+            raise ValueError(f"Tab handle {target} is invalid, not in the current tab list")
+        return target
+    raise TypeError("Invalid parameter type, supports int (index) or str (handle)")
+
+def _save_page_content(page_content, content_dir):
+    """
+    Write page HTML to a temporary file that outlives the call
+    :param page_content: Page HTML source
+    :param content_dir: Directory holding the saved pages, removed by quit_browser
+    Return: Path of the written file
+    """
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".html", dir=content_dir, delete=False) as html_file:
+        html_file.write(page_content)
+    return html_file.name
+
+@dataclass(slots=True)
+class _Response:
+    """
+    Unified result format of every operation, orjson serializes it natively
+    """
+    code: int
+    status: str
+    message: str
+    detail: object = None
+    data: object = None
+
+def _ok(message, detail=None, data=None):
+    """
+    Build a success response in the unified result format
+    """
+    return _Response(200, "success", message, detail, data)
+
+def _fail(message, detail=None, code=500):
+    """
+    Build a failure response in the unified result format
+    """
+    return _Response(code, "failed", message, detail)
 
-from fastmcp import FastMCP
+def _abbr(value, limit=512):
+    """
+    Cap caller-supplied strings (URLs, locators) echoed back in response details
+    :param value: Value to echo, non-string values are returned unchanged
+    :param limit: Max characters kept
+    """
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...<{len(value) - limit} more>"
+    return value
 
-mcp = FastMCP("Selenium MCP")
+def _error_text(e):
+    """
+    Short error text for responses. str() of a WebDriverException also renders its screenshot
+    and remote stacktrace, only the message is reported
+    """
+    if isinstance(e, WebDriverException):
+        return e.msg or type(e).__name__
+    return str(e)
+
+def _dumps(result):
+    """
+    Serialize a response to the JSON string returned to MCP clients
+    """
+    try:
+        return orjson.dumps(result, option=_JSON_OPTION).decode()
+    except orjson.JSONEncodeError:
+        # orjson rejects integers beyond 64 bits (e.g. an echoed target of 2**70), the stdlib encoder does not
+        if _JSON_OPTION:
+            return json.dumps(asdict(result), ensure_ascii=False, indent=2, default=str)
+        return json.dumps(asdict(result), ensure_ascii=False, separators=(",", ":"), default=str)
 
 class FirefoxAutoBrowser:
     """
     Firefox browser automation encapsulation class,
     implementing core functions of tab management and web page operations
     """
+    __slots__ = (
+        "driver", "command_executor", "firefox_binary_path", "page_load_timeout", "implicitly_wait",
+        "pool_size", "init_result", "_scope", "_last_handle", "_lock", "_spares",
+        "_connection", "_content_dir", "_closed"
+    )
+
     def __init__(self, command_executor='http://192.168.100.4:4444',
                  firefox_binary_path="C:\\Program Files\\Mozilla Firefox\\firefox.exe",
-                 page_load_timeout=30, implicitly_wait=10):
+                 page_load_timeout=30, implicitly_wait=10, pool_size=_POOL_SIZE):
         """
         Initialize browser driver and configuration
         :param command_executor: Remote driver address
         :param firefox_binary_path: Firefox executable file path
         :param page_load_timeout: Page load timeout time
-        :param implicitly_wait: Element implicit wait time
+        :param implicitly_wait: Default timeout (seconds) of the explicit element waits in click operations
+        :param pool_size: Browser sessions to start, sessions beyond the first are kept warm
+            and take over when the active session is invalidated. Needs a remote end that allows
+            several sessions (e.g. Selenium Grid), a bare geckodriver only runs one
         """
         self.driver = None
         self.command_executor = command_executor
         self.firefox_binary_path = firefox_binary_path
         self.page_load_timeout = page_load_timeout
         self.implicitly_wait = implicitly_wait
+        self.pool_size = pool_size
+        self._scope = None
+        self._last_handle = None
+        self._lock = threading.RLock()
+        self._spares = queue.Queue()
+        self._connection = None
+        self._content_dir = None
+        self._closed = False
 
         self.init_result = self._init_browser()
 
     def _init_browser(self):
         """
-        Private method: Configure Firefox options and initialize Remote driver
+        Private method: Start the active Remote driver and the pre-warmed spare sessions
         Return: JSON format initialization result
         """
         try:
-            firefox_options = FirefoxOptions()
-            firefox_options.binary_location = self.firefox_binary_path
-
-            custom_user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0"
-            firefox_options.add_argument(f"--user-agent={custom_user_agent}")
+            self.driver = self._create_driver()
+        except Exception as e:
+            return _dumps(_fail(f"Browser initialization failed: {_error_text(e)}"))
 
-            firefox_options.set_preference("dom.webnotifications.enabled", False)
-            firefox_options.set_preference("dom.popup_maximum", -1)
-            firefox_options.set_preference("browser.popups.showPopupBlocker", False)
-            firefox_options.set_preference("dom.disable_open_during_load", False)
-            firefox_options.set_preference("browser.link.open_newwindow", 3)
-            firefox_options.set_preference("browser.link.open_newwindow.restriction", 0)
+        # Spares are optional: the active session is usable even when the remote end refuses more
+        # sessions (a bare geckodriver only allows one), so a failed spare does not fail the init
+        init_detail = {"spare_sessions": 0}
+        try:
+            for _ in range(self.pool_size - 1):
+                self._spares.put(self._create_driver())
+        except Exception as e:
+            init_detail["spare_error"] = _error_text(e)
+        init_detail["spare_sessions"] = self._spares.qsize()
 
-            firefox_options.add_argument("--ignore-certificate-errors")
+        return _dumps(_ok("Browser initialized successfully", init_detail))
 
-            self.driver = webdriver.Remote(
-                command_executor=self.command_executor,
-                options=firefox_options
+    def _remote_connection(self):
+        """
+        Private method: HTTP connection to the remote driver, created once and shared by every
+        session (active and spares), so a new session reuses the open keep-alive connections
+        Return: FirefoxRemoteConnection
+        """
+        if self._connection is None:
+            # Calls are serialized by _acquire, but a background spare start (_refill_spare) can run
+            # beside one, so keep two connections. Selenium reads the PoolManager kwargs from this nested key
+            client_config = ClientConfig(
+                remote_server_addr=self.command_executor,
+                init_args_for_pool_manager={"init_args_for_pool_manager": {"maxsize": 2}}
             )
+            self._connection = FirefoxRemoteConnection(self.command_executor, client_config=client_config)
+        return self._connection
 
-            self.driver.set_page_load_timeout(self.page_load_timeout)
-            self.driver.implicitly_wait(self.implicitly_wait)
+    def _create_driver(self):
+        """
+        Private method: Start a new Remote driver session with the shared Firefox options
+        Return: Configured Remote driver
+        """
+        driver = webdriver.Remote(
+            command_executor=self._remote_connection(),
+            options=_firefox_options(self.firefox_binary_path)
+        )
 
-            success_json = {
-                "code": 200,
-                "status": "success",
-                "message": "Browser initialized successfully",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(success_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Browser initialization failed: {str(e)}",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+        # Implicit wait stays at the W3C default of 0, element lookups that need to wait do it explicitly
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return driver
+
+    @contextmanager
+    def _acquire(self):
+        """
+        Private method: hold the browser session for one public call. Tabs belong to a single
+        session, so concurrent calls are serialized instead of spread across sessions. An
+        invalidated session is replaced by a pre-warmed spare when one is available, and a new
+        spare is started in the background to take its place
+        """
+        with self._lock:
+            if self.driver is None and not self._spares.empty():
+                self.driver = self._spares.get_nowait()
+                self._last_handle = None
+                self._refill_spare()
+            yield self.driver
+
+    @contextmanager
+    def _rpc_scope(self):
+        """
+        Private method: memoize window handle lookups for the duration of one public call,
+        so its steps do not repeat the same WebDriver round-trip. Every public method opens
+        exactly one scope, the handle helpers below are only called inside it
+        """
+        self._scope = {}
+        try:
+            yield
+        finally:
+            self._scope = None
+
+    def _window_handles(self):
+        """
+        Private method: handles of all tabs, fetched at most once per call scope
+        """
+        scope = self._scope
+        if "window_handles" not in scope:
+            scope["window_handles"] = self.driver.window_handles
+        return scope["window_handles"]
+
+    def _current_window_handle(self):
+        """
+        Private method: handle of the active tab, fetched at most once per call scope
+        """
+        scope = self._scope
+        if "current_window_handle" not in scope:
+            scope["current_window_handle"] = self._last_handle = self.driver.current_window_handle
+        return scope["current_window_handle"]
+
+    def _switch_window(self, handle):
+        """
+        Private method: switch to the tab handle, skipping the WebDriver command when the tab is
+        already active. Only this class moves the session's current window, so the last handle
+        switched to or read back stays valid between calls
+        """
+        if handle != self._last_handle:
+            self.driver.switch_to.window(handle)
+            self._last_handle = handle
+        self._scope["current_window_handle"] = handle
+
+    def _ensure_tab(self, target):
+        """
+        Private method: make the target tab the active one, raising when it does not exist
+        :param target: Target tab (str: handle; int: index)
+        Return: Window handle of the target tab
+        """
+        target_handle = _resolve_handle(target, self._window_handles())
+        self._switch_window(target_handle)
+        return target_handle
+
+    def _page_content_dir(self):
+        """
+        Private method: directory for pages saved in file mode, created on first use
+        """
+        if self._content_dir is None:
+            self._content_dir = tempfile.mkdtemp(prefix="selenium_mcp_")
+        return self._content_dir
+
+    def _drop_invalid_session(self, e):
+        """
+        Private method: discard the active session once the remote end no longer knows it (e.g. an
+        idle timeout on the Grid), so the next call takes over a spare instead of failing on it
+        :param e: Exception caught by the operation
+        """
+        if isinstance(e, InvalidSessionIdException):
+            self._discard_session()
+
+    def _discard_session(self):
+        """
+        Private method: drop the active session and quit it on the remote end, so it does not keep
+        holding a Grid slot (or the only geckodriver session) after this class stops using it
+        """
+        driver, self.driver = self.driver, None
+        self._last_handle = None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def _refill_spare(self):
+        """
+        Private method: start a replacement spare session in the background after a takeover,
+        so the call that took over does not wait for a browser to start
+        """
+        def start_spare():
+            try:
+                spare = self._create_driver()
+            except Exception:
+                return
+            with self._lock:
+                if self._closed:
+                    spare.quit()
+                else:
+                    self._spares.put(spare)
+
+        threading.Thread(target=start_spare, daemon=True).start()
+
+    def _forget_window_handles(self):
+        """
+        Private method: drop the memoized handle list after tabs were opened or closed
+        """
+        self._scope.pop("window_handles", None)
+
+    def _wait_for_element(self, driver, by_locator, locator, wait_timeout=None):
+        """
+        Private method: wait until the element is present in the DOM
+        :param wait_timeout: Max seconds to wait (None: use implicitly_wait)
+        Return: Located web element, raises NoSuchElementException when it never appears
+        """
+        timeout = self.implicitly_wait if wait_timeout is None else wait_timeout
+        try:
+            return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by_locator, locator)))
+        except TimeoutException:
+            # Only the wait maps to "not found", a page load timeout raised by the click itself stays a WebDriver error
+            raise NoSuchElementException(f"No element matched within {timeout} seconds") from None
 
     def create_new_tab(self):
         """
         Function: Create a new blank tab
         Return: JSON format string (contains operation result and related information)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._create_new_tab_impl())
+
+    def _create_new_tab_impl(self):
+        """
+        Private method: body of create_new_tab
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
-            self.driver.execute_script("window.open('');")
+            driver.execute_script(_NEW_TAB_JS)
+            self._forget_window_handles()
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": "New tab created successfully",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to create new tab: {str(e)}",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _ok("New tab created successfully")
+
+        except Exception as e:
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to create new tab: {_error_text(e)}")
 
     def get_all_tabs(self):
         """
         Function: Get the list of handles of all current tabs, including detailed tab information
         Return: JSON format string (contains detailed tab information and handle list data)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._get_all_tabs_impl())
+
+    def _get_all_tabs_impl(self):
+        """
+        Private method: body of get_all_tabs
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
-            window_handles = self.driver.window_handles
+            window_handles = self._window_handles()
             tab_count = len(window_handles)
             active_handle = None
 
             try:
-                active_handle = self.driver.current_window_handle
-            except:
+                active_handle = self._current_window_handle()
+            except WebDriverException:
                 active_handle = None
 
             tabs_detail = {
                 "total_tabs": tab_count,
-                "tabs_info": []
+                "tabs_info": [
+                    {
+                        "index": index,
+                        "handle": handle,
+                        "handle_abbr": f"{handle[:20]}...",
+                        "status": "[Currently Active]" if handle == active_handle else "[Inactive]"
+                    }
+                    for index, handle in enumerate(window_handles)
+                ]
             }
-            for index, handle in enumerate(window_handles):
-                tab_status = "[Currently Active]" if (active_handle and handle == active_handle) else "[Inactive]"
-                tab_info = {
-                    "index": index,
-                    "handle": handle,
-                    "handle_abbr": handle[:20] + "...",
-                    "status": tab_status
-                }
-                tabs_detail["tabs_info"].append(tab_info)
-
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Successfully retrieved {tab_count} tabs in total",
-                "detail": tabs_detail,
-                "data": window_handles
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to get all tabs: {str(e)}",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+
+            return _ok(f"Successfully retrieved {tab_count} tabs in total", tabs_detail, window_handles)
+
+        except Exception as e:
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to get all tabs: {_error_text(e)}")
 
     def get_active_tab(self):
         """
         Function: Get the handle of the currently active (foreground display) tab, including detailed active tab information
         Return: JSON format string (contains active tab details and handle data)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._get_active_tab_impl())
+
+    def _get_active_tab_impl(self):
+        """
+        Private method: body of get_active_tab
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
-            current_window = self.driver.current_window_handle
-            all_handles = self.driver.window_handles
+            current_window = self._current_window_handle()
+            all_handles = self._window_handles()
             tab_count = len(all_handles)
             active_tab_index = all_handles.index(current_window)
 
@@ -181,24 +487,11 @@ class FirefoxAutoBrowser:
                 "active_tab_handle": current_window
             }
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": "Successfully retrieved current active tab information",
-                "detail": active_detail,
-                "data": current_window
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to get active tab: {str(e)}",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _ok("Successfully retrieved current active tab information", active_detail, current_window)
+
+        except Exception as e:
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to get active tab: {_error_text(e)}")
 
     def switch_to_specific_tab(self, target):
         """
@@ -206,53 +499,32 @@ class FirefoxAutoBrowser:
         :param target: Target tab (str: tab handle; int: tab index, starting from 0)
         Return: JSON format string (contains switch result and related information)
         """
-        try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._switch_to_specific_tab_impl(target))
 
-            all_handles = self.driver.window_handles
-            target_handle = None
+    def _switch_to_specific_tab_impl(self, target):
+        """
+        Private method: body of switch_to_specific_tab
+        Return: _Response
+        """
+        try:
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
-            if isinstance(target, int):
-                if 0 <= target < len(all_handles):
-                    target_handle = all_handles[target]
-                else:
-                    raise Exception(
-                        f"Tab index {target} is invalid, only {len(all_handles)} tabs exist currently (index 0~{len(all_handles) - 1})")
-            elif isinstance(target, str):
-                if target in all_handles:
-                    target_handle = target
-                else:
-                    raise Exception(f"Tab handle {target} is invalid, not in the current tab list")
-            else:
-                raise Exception("Invalid parameter type, supports int (index) or str (handle)")
+            target_handle = self._ensure_tab(target)
 
-            self.driver.switch_to.window(target_handle)
+            return _ok("Successfully switched to target tab", {
+                "target_param": target,
+                "target_handle": target_handle,
+                "target_handle_abbr": f"{target_handle[:20]}..."
+            })
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": "Successfully switched to target tab",
-                "detail": {
-                    "target_param": target,
-                    "target_handle": target_handle,
-                    "target_handle_abbr": target_handle[:20] + "..."
-                },
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to switch to specific tab: {str(e)}",
-                "detail": {
-                    "input_target": target
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to switch to specific tab: {_error_text(e)}", {
+                "input_target": target
+            })
 
     def open_url_in_specific_tab(self, url, target=0):
         """
@@ -261,143 +533,111 @@ class FirefoxAutoBrowser:
         :param target: Target tab (str: handle; int: index, default the first tab (index 0))
         Return: JSON format string (contains operation result and related information)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._open_url_in_specific_tab_impl(url, target))
+
+    def _open_url_in_specific_tab_impl(self, url, target=0):
+        """
+        Private method: body of open_url_in_specific_tab
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
             if not url or not isinstance(url, str):
-                raise Exception("Invalid web page address")
-
-            switch_result = json.loads(self.switch_to_specific_tab(target))
-            if switch_result["code"] != 200:
-                raise Exception(switch_result["message"])
-
-            self.driver.get(url)
-
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Successfully opened web page in target tab: {url}",
-                "detail": {
-                    "target_tab": target,
-                    "opened_url": url
-                },
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (TimeoutException, WebDriverException) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Web page loading timed out or failed to open: {str(e)}",
-                "detail": {
-                    "target_tab": target,
-                    "input_url": url
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
-        except (Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to open web page in specific tab: {str(e)}",
-                "detail": {
-                    "target_tab": target,
-                    "input_url": url
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+                raise ValueError("Invalid web page address")
+
+            self._ensure_tab(target)
+
+            driver.get(url)
+
+            return _ok(f"Successfully opened web page in target tab: {_abbr(url)}", {
+                "target_tab": target,
+                "opened_url": _abbr(url)
+            })
+
+        except WebDriverException as e:
+            self._drop_invalid_session(e)
+            return _fail(f"Web page loading timed out or failed to open: {_error_text(e)}", {
+                "target_tab": target,
+                "input_url": _abbr(url)
+            })
+        except Exception as e:
+            return _fail(f"Failed to open web page in specific tab: {_error_text(e)}", {
+                "target_tab": target,
+                "input_url": _abbr(url)
+            })
 
-    def get_specific_tab_page_content(self, target=None):
+    def get_specific_tab_page_content(self, target=None, return_mode="inline"):
         """
         Function: Get the page HTML content of the specified tab (default to get current active tab)
         :param target: Target tab (None: current active tab; str: handle; int: index)
-        Return: JSON format string (contains page content length and HTML source data)
+        :param return_mode: How the HTML is returned ("inline": HTML source in data;
+            "file": HTML written to a temporary .html file, data is the file path;
+            "auto": inline below 64 KB, file otherwise). The file lives on the machine running this
+            server, so "file"/"auto" only suit clients on the same machine; files are removed by quit_browser
+        Return: JSON format string (contains page content length and HTML source data or file path)
+        """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._get_specific_tab_page_content_impl(target, return_mode))
+
+    def _get_specific_tab_page_content_impl(self, target=None, return_mode="inline"):
+        """
+        Private method: body of get_specific_tab_page_content
+        Return: _Response
         """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
+
+            if return_mode not in _CONTENT_RETURN_MODES:
+                raise ValueError(f"Unsupported return mode: {return_mode}. Supported modes: {', '.join(_CONTENT_RETURN_MODES)}")
 
             current_handle = None
             target_info = {}
 
             if target is None:
-                current_handle = self.driver.current_window_handle
+                current_handle = self._current_window_handle()
                 target_info = {
                     "target_type": "current_active",
                     "target_handle": current_handle,
-                    "target_handle_abbr": current_handle[:20] + "..."
+                    "target_handle_abbr": f"{current_handle[:20]}..."
                 }
             else:
-                all_handles = self.driver.window_handles
-                target_handle = None
-                if isinstance(target, int):
-                    if 0 <= target < len(all_handles):
-                        target_handle = all_handles[target]
-                        target_info = {
-                            "target_type": "index",
-                            "input_target": target,
-                            "target_handle": target_handle,
-                            "target_handle_abbr": target_handle[:20] + "..."
-                        }
-                    else:
-                        raise Exception(f"Tab index {target} is invalid, only {len(all_handles)} tabs exist currently")
-                elif isinstance(target, str):
-                    if target in all_handles:
-                        target_handle = target
-                        target_info = {
-                            "target_type": "handle",
-                            "input_target": target,
-                            "target_handle": target_handle,
-                            "target_handle_abbr": target_handle[:20] + "..."
-                        }
-                    else:
-                        raise Exception(f"Tab handle {target} is invalid, not in the current tab list")
-                else:
-                    raise Exception("Invalid parameter type, supports int (index) or str (handle)")
-
-                self.driver.switch_to.window(target_handle)
+                target_handle = self._ensure_tab(target)
+                target_info = {
+                    "target_type": "index" if isinstance(target, int) else "handle",
+                    "input_target": target,
+                    "target_handle": target_handle,
+                    "target_handle_abbr": f"{target_handle[:20]}..."
+                }
                 current_handle = target_handle
 
-            page_content = self.driver.page_source
+            page_content = driver.page_source
             content_length = len(page_content)
 
             target_info["content_length"] = content_length
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Successfully retrieved target tab page content, content length: {content_length} characters",
-                "detail": target_info,
-                "data": page_content
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+            if return_mode == "file" or (return_mode == "auto" and content_length >= _INLINE_CONTENT_LIMIT):
+                target_info["return_mode"] = "file"
+                content_path = _save_page_content(page_content, self._page_content_dir())
+                return _ok(f"Successfully saved target tab page content to file, content length: {content_length} characters", target_info, content_path)
+
+            target_info["return_mode"] = "inline"
+            return _ok(f"Successfully retrieved target tab page content, content length: {content_length} characters", target_info, page_content)
 
         except WebDriverException as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to get tab page content (WebDriver exception): {str(e)}",
-                "detail": {
-                    "input_target": target
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to get tab page content (WebDriver exception): {_error_text(e)}", {
+                "input_target": target
+            })
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to get tab page content: {str(e)}",
-                "detail": {
-                    "input_target": target
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to get tab page content: {_error_text(e)}", {
+                "input_target": target
+            })
 
     def scroll_mouse_wheel_down(self, scroll_distance=500, target_tab=None):
         """
@@ -406,9 +646,18 @@ class FirefoxAutoBrowser:
         :param target_tab: Target tab (None: current active tab; str: handle; int: index)
         Return: JSON format string (contains scrolling operation result)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._scroll_mouse_wheel_down_impl(scroll_distance, target_tab))
+
+    def _scroll_mouse_wheel_down_impl(self, scroll_distance=500, target_tab=None):
+        """
+        Private method: body of scroll_mouse_wheel_down
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
             scroll_detail = {
                 "scroll_direction": "down",
@@ -417,46 +666,24 @@ class FirefoxAutoBrowser:
             }
 
             if target_tab is not None:
-                switch_result = json.loads(self.switch_to_specific_tab(target_tab))
-                if switch_result["code"] != 200:
-                    raise Exception(switch_result["message"])
+                self._ensure_tab(target_tab)
                 scroll_detail["switch_status"] = "Successfully switched to target tab"
 
-            self.driver.execute_script(f"window.scrollBy(0, {scroll_distance});")
+            driver.execute_script(_SCROLL_DOWN_JS, scroll_distance)
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Mouse wheel scrolled down successfully, scrolling distance: {scroll_distance} pixels",
-                "detail": scroll_detail,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+            return _ok(f"Mouse wheel scrolled down successfully, scrolling distance: {scroll_distance} pixels", scroll_detail)
 
         except WebDriverException as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to scroll mouse wheel down (WebDriver exception): {str(e)}",
-                "detail": {
-                    "scroll_distance": scroll_distance,
-                    "target_tab": target_tab
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to scroll mouse wheel down (WebDriver exception): {_error_text(e)}", {
+                "scroll_distance": scroll_distance,
+                "target_tab": target_tab
+            })
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to scroll mouse wheel down: {str(e)}",
-                "detail": {
-                    "scroll_distance": scroll_distance,
-                    "target_tab": target_tab
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to scroll mouse wheel down: {_error_text(e)}", {
+                "scroll_distance": scroll_distance,
+                "target_tab": target_tab
+            })
 
     def scroll_mouse_wheel_up(self, scroll_distance=500, target_tab=None):
         """
@@ -465,9 +692,18 @@ class FirefoxAutoBrowser:
         :param target_tab: Target tab (None: current active tab; str: handle; int: index)
         Return: JSON format string (contains scrolling operation result)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._scroll_mouse_wheel_up_impl(scroll_distance, target_tab))
+
+    def _scroll_mouse_wheel_up_impl(self, scroll_distance=500, target_tab=None):
+        """
+        Private method: body of scroll_mouse_wheel_up
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
             scroll_detail = {
                 "scroll_direction": "up",
@@ -476,133 +712,91 @@ class FirefoxAutoBrowser:
             }
 
             if target_tab is not None:
-                switch_result = json.loads(self.switch_to_specific_tab(target_tab))
-                if switch_result["code"] != 200:
-                    raise Exception(switch_result["message"])
+                self._ensure_tab(target_tab)
                 scroll_detail["switch_status"] = "Successfully switched to target tab"
 
-            self.driver.execute_script(f"window.scrollBy(0, -{scroll_distance});")
+            driver.execute_script(_SCROLL_UP_JS, scroll_distance)
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Mouse wheel scrolled up successfully, scrolling distance: {scroll_distance} pixels",
-                "detail": scroll_detail,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+            return _ok(f"Mouse wheel scrolled up successfully, scrolling distance: {scroll_distance} pixels", scroll_detail)
 
         except WebDriverException as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to scroll mouse wheel up (WebDriver exception): {str(e)}",
-                "detail": {
-                    "scroll_distance": scroll_distance,
-                    "target_tab": target_tab
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to scroll mouse wheel up (WebDriver exception): {_error_text(e)}", {
+                "scroll_distance": scroll_distance,
+                "target_tab": target_tab
+            })
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to scroll mouse wheel up: {str(e)}",
-                "detail": {
-                    "scroll_distance": scroll_distance,
-                    "target_tab": target_tab
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to scroll mouse wheel up: {_error_text(e)}", {
+                "scroll_distance": scroll_distance,
+                "target_tab": target_tab
+            })
 
-    def click_element_by_xpath(self, xpath, target_tab=None):
+    def click_element_by_xpath(self, xpath, target_tab=None, wait_timeout=None):
         """
         Function: Locate element by XPath expression and execute click operation
         :param xpath: XPath expression for targeting the element (str, required)
         :param target_tab: Target tab (None: current active tab; str: handle; int: index)
+        :param wait_timeout: Max seconds to wait for the element to appear (None: use implicitly_wait)
         Return: JSON format string (contains element locate and click operation result)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._click_element_by_xpath_impl(xpath, target_tab, wait_timeout))
+
+    def _click_element_by_xpath_impl(self, xpath, target_tab=None, wait_timeout=None):
+        """
+        Private method: body of click_element_by_xpath
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
+
             if not xpath or not isinstance(xpath, str):
-                raise Exception("Invalid XPath expression: it must be a non-empty string")
+                raise ValueError("Invalid XPath expression: it must be a non-empty string")
 
             click_detail = {
-                "xpath_expression": xpath,
+                "xpath_expression": _abbr(xpath),
                 "target_tab": target_tab,
                 "operation_status": "not_executed"
             }
 
             if target_tab is not None:
-                switch_result = json.loads(self.switch_to_specific_tab(target_tab))
-                if switch_result["code"] != 200:
-                    raise Exception(f"Failed to switch to target tab: {switch_result['message']}")
+                self._ensure_tab(target_tab)
                 click_detail["switch_status"] = "Successfully switched to target tab"
 
             click_detail["operation_status"] = "locating_element"
-            target_element = self.driver.find_element(By.XPATH, xpath)
-            if not target_element:
-                raise NoSuchElementException("Element not found even with valid XPath expression")
+            target_element = self._wait_for_element(driver, _BY_XPATH, xpath, wait_timeout)
 
             click_detail["operation_status"] = "clicking_element"
             target_element.click()
 
             click_detail["operation_status"] = "completed_successfully"
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": "Element located by XPath and clicked successfully",
-                "detail": click_detail,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+            return _ok("Element located by XPath and clicked successfully", click_detail)
 
         except NoSuchElementException as e:
-            fail_json = {
-                "code": 404,
-                "status": "failed",
-                "message": f"Element not found by XPath: {str(e)}",
-                "detail": {
-                    "xpath_expression": xpath,
-                    "target_tab": target_tab,
-                    "error_type": "NoSuchElementException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Element not found by XPath: {_error_text(e)}", {
+                "xpath_expression": _abbr(xpath),
+                "target_tab": target_tab,
+                "error_type": type(e).__name__
+            }, code=404)
 
         except WebDriverException as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to click element (WebDriver exception): {str(e)}",
-                "detail": {
-                    "xpath_expression": xpath,
-                    "target_tab": target_tab,
-                    "error_type": "WebDriverException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to click element (WebDriver exception): {_error_text(e)}", {
+                "xpath_expression": _abbr(xpath),
+                "target_tab": target_tab,
+                "error_type": "WebDriverException"
+            })
 
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to click element by XPath: {str(e)}",
-                "detail": {
-                    "xpath_expression": xpath,
-                    "target_tab": target_tab,
-                    "error_type": "GeneralException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to click element by XPath: {_error_text(e)}", {
+                "xpath_expression": _abbr(xpath),
+                "target_tab": target_tab,
+                "error_type": "GeneralException"
+            })
 
-    def click_element(self, locator, locator_type="xpath", target_tab=None):
+    def click_element(self, locator, locator_type="xpath", target_tab=None, smooth_scroll=False, wait_timeout=None):
         """
         Function: Universal element click function, supports multiple locator methods to click any clickable element
         (tags, buttons, links, etc.)
@@ -610,106 +804,75 @@ class FirefoxAutoBrowser:
         :param locator_type: Locator method (str, optional, default "xpath"), support:
             "id", "xpath", "name", "class_name", "css_selector", "tag_name", "link_text", "partial_link_text"
         :param target_tab: Target tab (None: current active tab; str: handle; int: index)
+        :param smooth_scroll: Animate scrolling the element into view (slower, default False jumps instantly)
+        :param wait_timeout: Max seconds to wait for the element to appear (None: use implicitly_wait)
         Return: JSON format string (contains element locate and click operation result)
         """
-        supported_locators = {
-            "id": By.ID,
-            "xpath": By.XPATH,
-            "name": By.NAME,
-            "class_name": By.CLASS_NAME,
-            "css_selector": By.CSS_SELECTOR,
-            "tag_name": By.TAG_NAME,
-            "link_text": By.LINK_TEXT,
-            "partial_link_text": By.PARTIAL_LINK_TEXT
-        }
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._click_element_impl(locator, locator_type, target_tab, smooth_scroll, wait_timeout))
 
+    def _click_element_impl(self, locator, locator_type="xpath", target_tab=None, smooth_scroll=False,
+                            wait_timeout=None):
+        """
+        Private method: body of click_element
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
-            if locator_type not in supported_locators:
-                supported_types = ", ".join(supported_locators.keys())
-                raise Exception(f"Unsupported locator type: {locator_type}. Supported types: {supported_types}")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
+
+            by_locator = _SUPPORTED_LOCATORS.get(locator_type)
+            if by_locator is None:
+                raise ValueError(f"Unsupported locator type: {locator_type}. Supported types: {_SUPPORTED_LOCATOR_NAMES}")
             if not locator or not isinstance(locator, str):
-                raise Exception("Invalid locator expression: it must be a non-empty string")
+                raise ValueError("Invalid locator expression: it must be a non-empty string")
 
             click_detail = {
                 "locator_type": locator_type,
-                "locator_expression": locator,
+                "locator_expression": _abbr(locator),
                 "target_tab": target_tab,
                 "operation_status": "not_executed"
             }
 
             if target_tab is not None:
-                switch_result = json.loads(self.switch_to_specific_tab(target_tab))
-                if switch_result["code"] != 200:
-                    raise Exception(f"Failed to switch to target tab: {switch_result['message']}")
+                self._ensure_tab(target_tab)
                 click_detail["switch_status"] = "Successfully switched to target tab"
 
             click_detail["operation_status"] = "locating_element"
-            by_locator = supported_locators[locator_type]
-            target_element = self.driver.find_element(by_locator, locator)
-
-            if not target_element:
-                raise NoSuchElementException(f"Element not found even with valid {locator_type} locator")
+            target_element = self._wait_for_element(driver, by_locator, locator, wait_timeout)
 
             click_detail["operation_status"] = "scrolling_to_element"
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", target_element)
+            driver.execute_script(_SMOOTH_SCROLL_INTO_VIEW_JS if smooth_scroll else _SCROLL_INTO_VIEW_JS, target_element)
             click_detail["operation_status"] = "clicking_element"
             target_element.click()
             click_detail["operation_status"] = "completed_successfully"
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Element located by {locator_type} and clicked successfully",
-                "detail": click_detail,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+            return _ok(f"Element located by {locator_type} and clicked successfully", click_detail)
 
         except NoSuchElementException as e:
-            fail_json = {
-                "code": 404,
-                "status": "failed",
-                "message": f"Element not found by {locator_type}: {str(e)}",
-                "detail": {
-                    "locator_type": locator_type,
-                    "locator_expression": locator,
-                    "target_tab": target_tab,
-                    "error_type": "NoSuchElementException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Element not found by {locator_type}: {_error_text(e)}", {
+                "locator_type": locator_type,
+                "locator_expression": _abbr(locator),
+                "target_tab": target_tab,
+                "error_type": type(e).__name__
+            }, code=404)
 
         except WebDriverException as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to click element (WebDriver exception): {str(e)}",
-                "detail": {
-                    "locator_type": locator_type,
-                    "locator_expression": locator,
-                    "target_tab": target_tab,
-                    "error_type": "WebDriverException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            self._drop_invalid_session(e)
+            return _fail(f"Failed to click element (WebDriver exception): {_error_text(e)}", {
+                "locator_type": locator_type,
+                "locator_expression": _abbr(locator),
+                "target_tab": target_tab,
+                "error_type": "WebDriverException"
+            })
 
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to click element by {locator_type}: {str(e)}",
-                "detail": {
-                    "locator_type": locator_type,
-                    "locator_expression": locator,
-                    "target_tab": target_tab,
-                    "error_type": "GeneralException"
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to click element by {locator_type}: {_error_text(e)}", {
+                "locator_type": locator_type,
+                "locator_expression": _abbr(locator),
+                "target_tab": target_tab,
+                "error_type": "GeneralException"
+            })
 
     def close_specific_tab(self, target=None):
         """
@@ -717,130 +880,127 @@ class FirefoxAutoBrowser:
         :param target: Target tab (None: current active tab; str: handle; int: index)
         Return: JSON format string (contains close operation result and subsequent switch information)
         """
+        with self._acquire(), self._rpc_scope():
+            return _dumps(self._close_specific_tab_impl(target))
+
+    def _close_specific_tab_impl(self, target=None):
+        """
+        Private method: body of close_specific_tab
+        Return: _Response
+        """
         try:
-            if not self.driver:
-                raise Exception("Browser driver not initialized")
+            driver = self.driver
+            if driver is None:
+                raise RuntimeError("Browser driver not initialized")
 
-            all_handles = self.driver.window_handles
+            all_handles = self._window_handles()
             tab_count_before_close = len(all_handles)
             if tab_count_before_close == 0:
-                raise Exception("No available tabs to close currently")
+                raise RuntimeError("No available tabs to close currently")
 
-            close_handle = None
-            close_detail = {
-                "tab_count_before_close": tab_count_before_close,
-                "input_target": target
-            }
             if target is None:
-                close_handle = self.driver.current_window_handle
-                close_detail["target_type"] = "current_active"
+                close_handle = self._current_window_handle()
+                target_type = "current_active"
             else:
-                if isinstance(target, int):
-                    if 0 <= target < tab_count_before_close:
-                        close_handle = all_handles[target]
-                        close_detail["target_type"] = "index"
-                    else:
-                        raise Exception(f"Tab index {target} is invalid, only {tab_count_before_close} tabs exist currently")
-                elif isinstance(target, str):
-                    if target in all_handles:
-                        close_handle = target
-                        close_detail["target_type"] = "handle"
-                    else:
-                        raise Exception(f"Tab handle {target} is invalid, not in the current tab list")
-                else:
-                    raise Exception("Invalid parameter type, supports int (index) or str (handle)")
-
-            close_detail["closed_handle"] = close_handle
-            close_detail["closed_handle_abbr"] = close_handle[:20] + "..."
+                close_handle = _resolve_handle(target, all_handles)
+                target_type = "index" if isinstance(target, int) else "handle"
 
-            self.driver.switch_to.window(close_handle)
+            self._switch_window(close_handle)
 
             is_last_tab = (tab_count_before_close == 1)
-            close_detail["is_last_tab"] = is_last_tab
 
-            self.driver.close()
+            # W3C Close Window answers with the handles that remain once the tab is gone,
+            # so no wait or follow-up window_handles query is needed
+            remaining_handles = driver.execute(Command.CLOSE)["value"]
+            self._last_handle = None
+            self._forget_window_handles()
 
+            post_close_operation = None
+            switched_handle = None
             if not is_last_tab:
-                time.sleep(0.5)
-                remaining_handles = self.driver.window_handles
+                if not isinstance(remaining_handles, list):
+                    # The remote end sent no handle list (Selenium then reports None), ask for it instead
+                    remaining_handles = self._window_handles()
                 if len(remaining_handles) > 0:
-                    self.driver.switch_to.window(remaining_handles[0])
-                    close_detail["post_close_operation"] = "Automatically switched to the first remaining tab"
-                    close_detail["switched_to_remaining_handle"] = remaining_handles[0]
+                    switched_handle = remaining_handles[0]
+                    self._switch_window(switched_handle)
+                    post_close_operation = "Automatically switched to the first remaining tab"
             else:
                 self.driver = None
-                close_detail["post_close_operation"] = "Closed the last tab, browser window exited, driver context invalidated"
-
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": f"Successfully closed tab: {close_handle}",
-                "detail": close_detail,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
+                post_close_operation = "Closed the last tab, browser window exited, driver context invalidated"
 
-        except WebDriverException as e:
             close_detail = {
+                "tab_count_before_close": tab_count_before_close,
                 "input_target": target,
-                "error_type": "WebDriverException"
+                "target_type": target_type,
+                "closed_handle": close_handle,
+                "closed_handle_abbr": f"{close_handle[:20]}...",
+                "is_last_tab": is_last_tab,
+                "post_close_operation": post_close_operation,
+                "switched_to_remaining_handle": switched_handle
             }
-            if "Browsing context has been discarded" in str(e) or "NoSuchWindowError" in str(e):
-                self.driver = None
-                close_detail["error_detail"] = "Browsing context invalidated (tab/browser closed), cannot continue operation"
-                message = "Browsing context invalidated (tab/browser closed), cannot continue operation"
-            else:
-                close_detail["error_detail"] = str(e)
-                message = f"Failed to close specific tab: {str(e)}"
-
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": message,
-                "detail": close_detail,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _ok(f"Successfully closed tab: {close_handle}", close_detail)
+
+        except (NoSuchWindowException, InvalidSessionIdException) as e:
+            self._discard_session()
+            return _fail("Browsing context invalidated (tab/browser closed), cannot continue operation", {
+                "input_target": target,
+                "error_type": type(e).__name__,
+                "error_detail": "Browsing context invalidated (tab/browser closed), cannot continue operation"
+            })
+        except WebDriverException as e:
+            return _fail(f"Failed to close specific tab: {_error_text(e)}", {
+                "input_target": target,
+                "error_type": "WebDriverException",
+                "error_detail": _error_text(e)
+            })
         except Exception as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to close specific tab: {str(e)}",
-                "detail": {
-                    "input_target": target
-                },
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+            return _fail(f"Failed to close specific tab: {_error_text(e)}", {
+                "input_target": target
+            })
 
     def quit_browser(self):
         """
         Function: Close all tabs and exit browser driver, release resources
         Return: JSON format string (contains exit operation result)
         """
-        try:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+        # Only the lock, not _acquire: taking over a spare here would start a new spare just to quit it
+        with self._lock:
+            return _dumps(self._quit_browser_impl())
 
-            result_json = {
-                "code": 200,
-                "status": "success",
-                "message": "Browser exited successfully, resources released",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(result_json, ensure_ascii=False, indent=2)
-
-        except (WebDriverException, Exception) as e:
-            fail_json = {
-                "code": 500,
-                "status": "failed",
-                "message": f"Failed to quit browser: {str(e)}",
-                "detail": None,
-                "data": None
-            }
-            return json.dumps(fail_json, ensure_ascii=False, indent=2)
+    def _quit_browser_impl(self):
+        """
+        Private method: body of quit_browser
+        Return: _Response
+        """
+        self._closed = True
+        sessions = [] if self.driver is None else [self.driver]
+        self.driver = None
+        self._last_handle = None
+        while not self._spares.empty():
+            sessions.append(self._spares.get_nowait())
+
+        # Quit every session on its own, one that already failed must not keep the others alive
+        errors = []
+        for session in sessions:
+            try:
+                session.quit()
+            except InvalidSessionIdException:
+                # Already gone on the remote end, nothing left to release
+                pass
+            except Exception as e:
+                errors.append(_error_text(e))
+
+        if self._content_dir is not None:
+            shutil.rmtree(self._content_dir, ignore_errors=True)
+            self._content_dir = None
+
+        if errors:
+            return _fail(f"Failed to quit browser: {'; '.join(errors)}", {
+                "total_sessions": len(sessions),
+                "failed_sessions": len(errors)
+            })
+        return _ok("Browser exited successfully, resources released")
 
 browser = None
 try:
@@ -848,76 +1008,59 @@ try:
 except Exception as init_error:
     browser = None
 
-@mcp.tool()
+def _require_browser(fail_message):
+    """
+    Answer with a failure when the browser instance could not be created, the failure JSON is
+    serialized once per tool when it is decorated
+    :param fail_message: Failure message of the decorated tool
+    """
+    fail_json = _dumps(_fail(fail_message))
+
+    def decorator(tool):
+        @functools.wraps(tool)
+        def wrapper(*args, **kwargs):
+            if browser is None:
+                return fail_json
+            return tool(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Tools stay synchronous: FastMCP runs sync tools in a worker thread, so the blocking WebDriver round
+# trips do not stall the server loop, and FirefoxAutoBrowser's lock serializes the browser itself
+@_require_browser("浏览器实例未初始化，无法创建新标签页")
 def create_new_tab() -> str:
     """
     功能：创建一个新的空白浏览器标签页
     返回：JSON格式字符串，包含创建操作的成功/失败状态及相关提示信息
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法创建新标签页",
-            "detail": None,
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.create_new_tab()
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无法获取标签页列表")
 def get_all_tabs() -> str:
     """
     功能：获取当前浏览器中所有标签页的详细信息
     返回：JSON格式字符串，包含标签页总数、每个标签的索引、句柄、激活状态等详细数据
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法获取标签页列表",
-            "detail": None,
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.get_all_tabs()
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无法获取激活标签页")
 def get_active_tab() -> str:
     """
     功能：获取当前处于激活状态（前台显示）的标签页详细信息
     返回：JSON格式字符串，包含激活标签的索引、句柄及当前总标签数等信息
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法获取激活标签页",
-            "detail": None,
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.get_active_tab()
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无法切换标签页")
 def switch_to_specific_tab(target) -> str:
     """
     功能：切换到指定的浏览器标签页
     参数：target - 目标标签页标识（整数：标签索引，从0开始；字符串：标签句柄）
     返回：JSON格式字符串，包含切换操作的成功/失败状态及目标标签的相关信息
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法切换标签页",
-            "detail": {"input_target": target},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.switch_to_specific_tab(target)
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无法打开网页")
 def open_url_in_specific_tab(url: str, target=0) -> str:
     """
     功能：在指定的浏览器标签页中打开指定的网页地址
@@ -926,36 +1069,22 @@ def open_url_in_specific_tab(url: str, target=0) -> str:
         target - 目标标签页标识（整数：标签索引；字符串：标签句柄，默认值0，即第一个标签页）
     返回：JSON格式字符串，包含网页打开操作的成功/失败状态及相关详情
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法打开网页",
-            "detail": {"target_tab": target, "input_url": url},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.open_url_in_specific_tab(url, target)
 
-@mcp.tool()
-def get_specific_tab_page_content(target=None) -> str:
+@_require_browser("浏览器实例未初始化，无法获取网页内容")
+def get_specific_tab_page_content(target=None, return_mode="inline") -> str:
     """
     功能：获取指定标签页的网页HTML完整内容
-    参数：target - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
-    返回：JSON格式字符串，包含网页内容长度及完整HTML源码数据
+    参数：
+        target - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
+        return_mode - 返回方式（inline：HTML源码直接放入data；file：写入临时.html文件，data为文件路径；
+                      auto：内容小于64KB时inline，否则file，默认inline）
+                      文件保存在运行本服务的机器上，file/auto仅适用于同一台机器上的客户端，quit_browser时删除
+    返回：JSON格式字符串，包含网页内容长度及完整HTML源码数据（或HTML文件路径）
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法获取网页内容",
-            "detail": {"input_target": target},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
-    return browser.get_specific_tab_page_content(target)
-
-@mcp.tool()
+    return browser.get_specific_tab_page_content(target, return_mode)
+
+@_require_browser("浏览器实例未初始化，无法执行滚动操作")
 def scroll_mouse_wheel_down(scroll_distance=500, target_tab=None) -> str:
     """
     功能：模拟鼠标滚轮向下滚动指定距离
@@ -964,18 +1093,9 @@ def scroll_mouse_wheel_down(scroll_distance=500, target_tab=None) -> str:
         target_tab - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
     返回：JSON格式字符串，包含滚动操作的成功/失败状态及相关详情
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法执行滚动操作",
-            "detail": {"scroll_distance": scroll_distance, "target_tab": target_tab},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.scroll_mouse_wheel_down(scroll_distance, target_tab)
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无法执行滚动操作")
 def scroll_mouse_wheel_up(scroll_distance=500, target_tab=None) -> str:
     """
     功能：模拟鼠标滚轮向上滚动指定距离
@@ -984,92 +1104,86 @@ def scroll_mouse_wheel_up(scroll_distance=500, target_tab=None) -> str:
         target_tab - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
     返回：JSON格式字符串，包含滚动操作的成功/失败状态及相关详情
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法执行滚动操作",
-            "detail": {"scroll_distance": scroll_distance, "target_tab": target_tab},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.scroll_mouse_wheel_up(scroll_distance, target_tab)
 
-@mcp.tool()
-def click_element_by_xpath(xpath: str, target_tab=None) -> str:
+@_require_browser("浏览器实例未初始化，无法执行元素点击操作")
+def click_element_by_xpath(xpath: str, target_tab=None, wait_timeout=None) -> str:
     """
     功能：通过XPath表达式定位指定标签页中的元素，并执行点击操作
     参数：
         xpath - XPath定位表达式（字符串，必填，用于精准定位页面元素）
         target_tab - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
+        wait_timeout - 等待元素出现的最长时间（秒，默认None使用浏览器配置的等待时间）
     返回：JSON格式字符串，包含元素定位及点击操作的成功/失败状态及相关详情
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法执行元素点击操作",
-            "detail": {"xpath_expression": xpath, "target_tab": target_tab},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
-    return browser.click_element_by_xpath(xpath, target_tab)
-
-@mcp.tool()
-def click_element(locator: str, locator_type="xpath", target_tab=None) -> str:
+    return browser.click_element_by_xpath(xpath, target_tab, wait_timeout)
+
+@_require_browser("浏览器实例未初始化，无法执行元素点击操作")
+def click_element(locator: str, locator_type="xpath", target_tab=None, smooth_scroll=False, wait_timeout=None) -> str:
     """
     功能：通用元素点击函数，支持多种定位方式定位并点击页面元素（按钮、链接等）
     参数：
         locator - 元素定位表达式（字符串，必填，如id值、CSS选择器、XPath表达式等）
         locator_type - 定位方式（字符串，可选，默认"xpath"，支持id、name、css_selector等8种方式）
         target_tab - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
+        smooth_scroll - 是否平滑滚动到元素位置（布尔值，默认False直接跳转，平滑滚动会增加点击耗时）
+        wait_timeout - 等待元素出现的最长时间（秒，默认None使用浏览器配置的等待时间）
     返回：JSON格式字符串，包含元素定位及点击操作的成功/失败状态及相关详情
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法执行元素点击操作",
-            "detail": {"locator_expression": locator, "locator_type": locator_type, "target_tab": target_tab},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
-    return browser.click_element(locator, locator_type, target_tab)
-
-@mcp.tool()
+    return browser.click_element(locator, locator_type, target_tab, smooth_scroll, wait_timeout)
+
+@_require_browser("浏览器实例未初始化，无法关闭标签页")
 def close_specific_tab(target=None) -> str:
     """
     功能：关闭指定的浏览器标签页
     参数：target - 目标标签页标识（None：当前激活标签；整数：标签索引；字符串：标签句柄，默认None）
     返回：JSON格式字符串，包含关闭操作的成功/失败状态及关闭后的标签页切换信息
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无法关闭标签页",
-            "detail": {"input_target": target},
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.close_specific_tab(target)
 
-@mcp.tool()
+@_require_browser("浏览器实例未初始化，无需执行退出操作")
 def quit_browser() -> str:
     """
     功能：关闭所有浏览器标签页，退出浏览器驱动并释放相关系统资源
     返回：JSON格式字符串，包含浏览器退出操作的成功/失败状态及相关提示信息
     """
-    if browser is None:
-        fail_json = {
-            "code": 500,
-            "status": "failed",
-            "message": "浏览器实例未初始化，无需执行退出操作",
-            "detail": None,
-            "data": None
-        }
-        return json.dumps(fail_json, ensure_ascii=False, indent=2)
     return browser.quit_browser()
 
+_MCP_TOOLS = (
+    create_new_tab, get_all_tabs, get_active_tab, switch_to_specific_tab,
+    open_url_in_specific_tab, get_specific_tab_page_content, scroll_mouse_wheel_down,
+    scroll_mouse_wheel_up, click_element_by_xpath, click_element, close_specific_tab,
+    quit_browser
+)
+
+
+def _create_mcp_server():
+    """
+    Build the FastMCP server and register the tools, fastmcp is only imported here
+    Return: FastMCP instance
+    """
+    from fastmcp import FastMCP
+
+    server = FastMCP("Selenium MCP")
+    # Tools already return the serialized JSON text; without output_schema=None FastMCP would
+    # also attach the same string as structured content and send every payload twice
+    for tool in _MCP_TOOLS:
+        server.tool(output_schema=None)(tool)
+    return server
+
+
+def __getattr__(name):
+    # main.mcp is created on first access so importing the module does not pull in fastmcp
+    if name == "mcp":
+        server = globals()["mcp"] = _create_mcp_server()
+        return server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http", host="0.0.0.0", port=8001, path="/mcp")
+    mcp = _create_mcp_server()
+    if _MCP_TRANSPORT == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        # Keep idle client connections open long enough for the next tool call to reuse them
+        mcp.run(transport=_MCP_TRANSPORT, host="0.0.0.0", port=8001, path="/mcp",
+                uvicorn_config={"timeout_keep_alive": 75})